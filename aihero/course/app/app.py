@@ -1,25 +1,39 @@
 import streamlit as st
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import ingest
 import search_agent
 import logs
 
-@st.cache_resource
 def init_agent():
     repo_owner = "DataTalksClub"
     repo_name = "faq"
     
-    def filter(doc):
-        return "data-engineering" in doc["filename"]
-    
-    st.write("🔄 Indexing repo...")
-    index = ingest.index_data(repo_owner, repo_name, filter=filter)
+    index = ingest.index_data(repo_owner, repo_name, include=["*data-engineering*"])
     agent = search_agent.init_agent(index, repo_owner, repo_name)
     return agent
 
-agent = init_agent()
+@st.cache_resource
+def start_indexing():
+    # Index in the background so the page renders right away
+    executor = ThreadPoolExecutor(max_workers=1)
+    return executor.submit(init_agent)
+
+def get_agent():
+    global indexing
+    if indexing.done() and indexing.exception() is not None:
+        # Don't keep a failed build cached; start over on this request
+        start_indexing.clear()
+        indexing = start_indexing()
+    if not indexing.done():
+        with st.spinner("🔄 Indexing repo..."):
+            return indexing.result()
+    return indexing.result()
 
 st.set_page_config(page_title="AI FAQ Assistant", page_icon="🤖", layout="centered")
+
+indexing = start_indexing()
+
 st.title("🤖 AI FAQ Assistant")
 st.caption("Ask me anything about the DataTalksClub/faq repository")
 
@@ -31,6 +45,8 @@ for msg in st.session_state.messages:
         st.markdown(msg["content"])
 
 def stream_response(prompt: str):
+    agent = get_agent()
+    
     async def agen():
         async with agent.run_stream(user_prompt=prompt) as result:
             last_len = 0
@@ -1,25 +1,60 @@
 import io
+import os
 import zipfile
-import requests
-import frontmatter
-from minsearch import Index
+from fnmatch import fnmatchcase
+
+def parse_markdown(content):
+    import frontmatter
+
+    post = frontmatter.loads(content)
+    return post.to_dict()
+
+PARSERS = {
+    '.md': parse_markdown,
+    '.mdx': parse_markdown,
+}
+
+def select_file(filename, include=None, exclude=None, path_filter=None):
+    """
+    Decide from the repo-relative path alone whether a file is read.
+
+    include/exclude are lists of glob patterns; path_filter is an
+    optional predicate on the path.
+    """
+    if include is not None and not any(fnmatchcase(filename, p) for p in include):
+        return False
+    if exclude is not None and any(fnmatchcase(filename, p) for p in exclude):
+        return False
+    if path_filter is not None and not path_filter(filename):
+        return False
+    return True
+
+def read_repo_data(repo_owner, repo_name, include=None, exclude=None, path_filter=None, parsers=None):
+    import requests
+
+    if parsers is None:
+        parsers = PARSERS
 
-def read_repo_data(repo_owner, repo_name):
     url = f'https://codeload.github.com/{repo_owner}/{repo_name}/zip/refs/heads/main'
     resp = requests.get(url)
     repository_data = []
     zf = zipfile.ZipFile(io.BytesIO(resp.content))
     
     for file_info in zf.infolist():
-        filename = file_info.filename.lower()
-        if not (filename.endswith('.md') or filename.endswith('.mdx')):
+        if file_info.is_dir():
+            continue
+
+        _, filename_repo = file_info.filename.split('/', maxsplit=1)
+        extension = os.path.splitext(filename_repo)[1].lower()
+        parser = parsers.get(extension)
+        if parser is None:
+            continue
+        # Filters run on member names, so skipped files are never decompressed
+        if not select_file(filename_repo, include, exclude, path_filter):
             continue
             
         with zf.open(file_info) as f_in:
-            content = f_in.read()
-            post = frontmatter.loads(content)
-            data = post.to_dict()
-            _, filename_repo = file_info.filename.split('/', maxsplit=1)
+            data = parser(f_in.read())
             data['filename'] = filename_repo
             repository_data.append(data)
     
@@ -50,8 +85,10 @@ def chunk_documents(docs, size=2000, step=1000):
         chunks.extend(doc_chunks)
     return chunks
 
-def index_data(repo_owner, repo_name, filter=None, chunk=False, chunking_params=None):
-    docs = read_repo_data(repo_owner, repo_name)
+def index_data(repo_owner, repo_name, filter=None, chunk=False, chunking_params=None,
+               include=None, exclude=None, path_filter=None, parsers=None):
+    docs = read_repo_data(repo_owner, repo_name, include=include, exclude=exclude,
+                          path_filter=path_filter, parsers=parsers)
     
     if filter is not None:
         docs = [doc for doc in docs if filter(doc)]
@@ -61,6 +98,8 @@ def index_data(repo_owner, repo_name, filter=None, chunk=False, chunking_params=
             chunking_params = {'size': 2000, 'step': 1000}
         docs = chunk_documents(docs, **chunking_params)
     
+    from minsearch import Index
+
     index = Index(text_fields=["content", "filename"])
     index.fit(docs)
     return index
\ No newline at end of file
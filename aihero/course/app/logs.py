@@ -3,12 +3,13 @@ import json
 import secrets
 from pathlib import Path
 from datetime import datetime
-from pydantic_ai.messages import ModelMessagesTypeAdapter
 
 LOG_DIR = Path(os.getenv('LOGS_DIRECTORY', 'logs'))
-LOG_DIR.mkdir(exist_ok=True)
 
 def log_entry(agent, messages, source="user"):
+    # pydantic_ai is heavy to import, so load it on the first log write
+    from pydantic_ai.messages import ModelMessagesTypeAdapter
+
     tools = []
     for ts in agent.toolsets:
         tools.extend(ts.tools.keys())
@@ -37,6 +38,7 @@ def log_interaction_to_file(agent, messages, source='user'):
     rand_hex = secrets.token_hex(3)
     
     filename = f"{agent.name}_{ts_str}_{rand_hex}.json"
+    LOG_DIR.mkdir(exist_ok=True)
     filepath = LOG_DIR / filename
     
     with filepath.open("w", encoding="utf-8") as f_out:
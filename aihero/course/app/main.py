@@ -2,6 +2,7 @@ import ingest
 import search_agent 
 import logs
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 REPO_OWNER = "DataTalksClub"
 REPO_NAME = "faq"
@@ -10,10 +11,7 @@ def initialize_index():
     print(f"Starting AI FAQ Assistant for {REPO_OWNER}/{REPO_NAME}")
     print("Initializing data ingestion...")
     
-    def filter(doc):
-        return 'data-engineering' in doc['filename']
-    
-    index = ingest.index_data(REPO_OWNER, REPO_NAME, filter=filter)
+    index = ingest.index_data(REPO_OWNER, REPO_NAME, include=['*data-engineering*'])
     print("Data indexing completed successfully!")
     return index
 
@@ -24,8 +22,12 @@ def initialize_agent(index):
     return agent
 
 def main():
-    index = initialize_index()
-    agent = initialize_agent(index)
+    executor = ThreadPoolExecutor(max_workers=1)
+    # Index in the background while the user types the first question
+    indexing = executor.submit(initialize_index)
+    executor.shutdown(wait=False)
+    agent = None
+    
     print("\nReady to answer your questions!")
     print("Type 'stop' to exit the program.\n")
     
@@ -35,6 +37,9 @@ def main():
             print("Goodbye!")
             break
         
+        if agent is None:
+            agent = initialize_agent(indexing.result())
+        
         print("Processing your question...")
         response = asyncio.run(agent.run(user_prompt=question))
         logs.log_interaction_to_file(agent, response.new_messages())
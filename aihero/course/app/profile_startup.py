@@ -0,0 +1,78 @@
+"""
+Startup Profiler
+
+Reports import time per module and, optionally, the time spent
+building the index and the agent. App modules should stay within
+the import budget; heavy dependencies are only paid for on first use.
+
+Usage:
+    cd course/app
+    python profile_startup.py          # imports only
+    python profile_startup.py --init   # imports + index/agent init
+"""
+
+import sys
+import time
+import importlib
+
+
+# --- Config ---
+IMPORT_BUDGET_MS = 100
+
+APP_MODULES = ['logs', 'search_tools', 'search_agent', 'ingest']
+HEAVY_MODULES = ['requests', 'frontmatter', 'minsearch', 'pydantic_ai', 'streamlit']
+
+REPO_OWNER = "DataTalksClub"
+REPO_NAME = "faq"
+
+
+def time_import(name):
+    start = time.perf_counter()
+    importlib.import_module(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def time_call(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    over_budget = []
+
+    print("App module imports:")
+    for name in APP_MODULES:
+        ms = time_import(name)
+        status = "OK"
+        if ms > IMPORT_BUDGET_MS:
+            status = "OVER BUDGET"
+            over_budget.append(name)
+        print(f"  {name:20s} {ms:8.1f} ms  {status}")
+
+    print("\nDeferred dependency imports:")
+    for name in HEAVY_MODULES:
+        try:
+            ms = time_import(name)
+        except ImportError:
+            print(f"  {name:20s}  not installed")
+            continue
+        print(f"  {name:20s} {ms:8.1f} ms")
+
+    if '--init' in sys.argv:
+        import ingest
+        import search_agent
+
+        print("\nInitialization:")
+        index, ms = time_call(ingest.index_data, REPO_OWNER, REPO_NAME, include=['*data-engineering*'])
+        print(f"  {'ingest.index_data':20s} {ms:8.1f} ms")
+        _, ms = time_call(search_agent.init_agent, index, REPO_OWNER, REPO_NAME)
+        print(f"  {'search_agent.init':20s} {ms:8.1f} ms")
+
+    if over_budget:
+        print(f"\nOver the {IMPORT_BUDGET_MS} ms import budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import search_tools
-from pydantic_ai import Agent
 
 SYSTEM_PROMPT_TEMPLATE = """
 You are a helpful assistant that answers questions about documentation.
@@ -17,6 +16,8 @@ If the search doesn't return relevant results, let the user know and provide gen
 """
 
 def init_agent(index, repo_owner, repo_name):
+    from pydantic_ai import Agent
+
     system_prompt = SYSTEM_PROMPT_TEMPLATE.format(repo_owner=repo_owner, repo_name=repo_name)
     search_tool = search_tools.SearchTool(index=index)
     
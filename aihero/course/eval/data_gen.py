@@ -86,16 +86,12 @@ async def run_agent_on_questions(agent, questions):
 async def main():
     print(f"Indexing {REPO_OWNER}/{REPO_NAME}...")
 
-    def filter_fn(doc):
-        return 'data-engineering' in doc['filename']
-
-    index = ingest.index_data(REPO_OWNER, REPO_NAME, filter=filter_fn)
+    index = ingest.index_data(REPO_OWNER, REPO_NAME, include=['*data-engineering*'])
     agent = search_agent.init_agent(index, REPO_OWNER, REPO_NAME)
 
     print(f"Generating {NUM_SAMPLES} test questions...")
 
-    dtc_faq = ingest.read_repo_data(REPO_OWNER, REPO_NAME)
-    de_dtc_faq = [d for d in dtc_faq if 'data-engineering' in d['filename']]
+    de_dtc_faq = ingest.read_repo_data(REPO_OWNER, REPO_NAME, include=['*data-engineering*'])
 
     questions = await generate_questions(de_dtc_faq, NUM_SAMPLES)
 
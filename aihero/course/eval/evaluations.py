@@ -2,16 +2,20 @@
 Agent Evaluation Pipeline
 
 Evaluates logged agent interactions using LLM-as-judge.
-Reads log files, runs each through an evaluation checklist,
-and prints pass rate metrics.
+Reads log files, runs each new one through an evaluation checklist,
+stores the verdicts in the metrics store and prints pass rate metrics
+for this run, the trend against the previous run, and totals by day,
+model and source.
 
 Usage:
     cd course/app
     export OPENAI_API_KEY='your-key'
-    python ../eval/evaluations.py
+    python ../eval/evaluations.py          # evaluate logs not seen before
+    python ../eval/evaluations.py --all    # re-evaluate every log
 """
 
 import os
+import sys
 import json
 import asyncio
 from pathlib import Path
@@ -19,6 +23,8 @@ from pathlib import Path
 from pydantic import BaseModel
 from pydantic_ai import Agent
 
+import metrics_store
+
 
 # --- Config ---
 LOG_DIR = Path(os.path.join(os.path.dirname(__file__), '..', 'app', 'logs'))
@@ -27,6 +33,8 @@ LOG_DIR = Path(os.path.join(os.path.dirname(__file__), '..', 'app', 'logs'))
 if not LOG_DIR.exists():
     LOG_DIR = Path(os.path.join(os.path.dirname(__file__), '..', 'logs'))
 
+EVAL_MODEL = 'gpt-4o-mini'
+
 
 # --- Evaluation Models ---
 class EvaluationCheck(BaseModel):
@@ -61,7 +69,7 @@ Output true/false for each check and provide a short explanation for your judgme
 
 eval_agent = Agent(
     name='eval_agent',
-    model='gpt-4o-mini',
+    model=EVAL_MODEL,
     instructions=evaluation_prompt,
     output_type=EvaluationChecklist
 )
@@ -136,94 +144,86 @@ async def evaluate_log_record(eval_agent, log_record):
     return result.output
 
 
+# --- Report ---
+def format_rate(rate):
+    return "  n/a" if rate is None else f"{rate:4.0%}"
+
+
+def print_pass_rates(rows):
+    for _, check_name, rate, _ in rows:
+        bar = "#" * int(rate * 20) + "." * (20 - int(rate * 20))
+        print(f"  {check_name:25s} [{bar}] {rate:.0%}")
+
+
+def print_report(conn, run_id):
+    print("\n" + "=" * 60)
+    print("EVALUATION RESULTS")
+    print("=" * 60)
+
+    if run_id is not None:
+        print("\nPer-question results:")
+        for question, failed in metrics_store.failed_checks(conn, run_id):
+            status = "PASS" if not failed else f"FAIL ({failed})"
+            print(f"  {question[:60]}... -> {status}")
+
+        print("\nPass rates for this run:")
+        print_pass_rates(metrics_store.pass_rates(conn, run_id=run_id))
+
+        previous = metrics_store.previous_run(conn, run_id)
+        if previous is not None:
+            print(f"\nTrend vs run {previous}:")
+            for check_name, rate_a, rate_b, delta in metrics_store.compare_runs(conn, previous, run_id):
+                change = "" if delta is None else f"{delta:+.0%}"
+                print(f"  {check_name:25s} {format_rate(rate_a)} -> {format_rate(rate_b)}  {change}")
+
+    for group_by in ['day', 'model', 'source']:
+        print(f"\nLatest verdicts by {group_by}:")
+        for group, check_name, rate, count in metrics_store.pass_rates(conn, group_by=group_by):
+            print(f"  {str(group):12s} {check_name:25s} {rate:.0%} (n={count})")
+
+
 # --- Main ---
 async def main():
-    # Collect log files
+    conn = metrics_store.connect()
+    evaluated = set() if '--all' in sys.argv else metrics_store.evaluated_files(conn)
+
+    # Collect log files that have not been evaluated yet
     eval_set = []
+    skipped = 0
 
     print(f"Looking for logs in: {LOG_DIR}")
 
     for log_file in sorted(LOG_DIR.glob('*.json')):
+        if log_file.name in evaluated:
+            skipped += 1
+            continue
         log_record = load_log_file(log_file)
         eval_set.append(log_record)
 
-    if not eval_set:
+    if not eval_set and not skipped:
         print("No log files found. Run data_gen.py first to generate interactions.")
         return
 
-    print(f"Found {len(eval_set)} log files. Running evaluation...\n")
+    if not eval_set:
+        print(f"All {skipped} log files were already evaluated (use --all to re-run).")
+        print_report(conn, run_id=None)
+        return
+
+    print(f"Found {len(eval_set)} new log files ({skipped} already evaluated). Running evaluation...\n")
 
-    # Evaluate each log
-    eval_results = []
+    run_id = metrics_store.start_run(conn, eval_model=EVAL_MODEL)
 
+    # Evaluate each log and store the verdicts as they come in
     for i, log_record in enumerate(eval_set):
         messages = log_record['messages']
         question = messages[0]['parts'][0]['content']
         print(f"[{i+1}/{len(eval_set)}] Evaluating: {question[:60]}...")
 
         eval_result = await evaluate_log_record(eval_agent, log_record)
-        eval_results.append((log_record, eval_result))
-
-    # Build results table
-    rows = []
-
-    for log_record, eval_result in eval_results:
-        messages = log_record['messages']
-
-        row = {
-            'file': Path(log_record['log_file']).name,
-            'question': messages[0]['parts'][0]['content'],
-            'answer': messages[-1]['parts'][0]['content'],
-        }
-
-        checks = {c.check_name: c.check_pass for c in eval_result.checklist}
-        row.update(checks)
+        metrics_store.record(conn, run_id, log_record, eval_result)
 
-        rows.append(row)
-
-    # Print results
-    print("\n" + "=" * 60)
-    print("EVALUATION RESULTS")
-    print("=" * 60)
-
-    # Try pandas for nice output, fall back to manual
-    try:
-        import pandas as pd
-
-        df_evals = pd.DataFrame(rows)
-
-        print("\nPer-question results:")
-        for _, row in df_evals.iterrows():
-            q = row['question'][:60]
-            checks = {k: v for k, v in row.items() if k not in ['file', 'question', 'answer']}
-            failed = [k for k, v in checks.items() if v == False]
-            status = "PASS" if not failed else f"FAIL ({', '.join(failed)})"
-            print(f"  {q}... -> {status}")
-
-        print("\nOverall pass rates:")
-        means = df_evals.mean(numeric_only=True)
-        for check_name, rate in means.items():
-            bar = "#" * int(rate * 20) + "." * (20 - int(rate * 20))
-            print(f"  {check_name:25s} [{bar}] {rate:.0%}")
-
-        print(f"\nTotal interactions evaluated: {len(df_evals)}")
-
-    except ImportError:
-        # No pandas, print manually
-        check_names = [k for k in rows[0] if k not in ['file', 'question', 'answer']]
-        totals = {name: 0 for name in check_names}
-
-        for row in rows:
-            for name in check_names:
-                if row.get(name):
-                    totals[name] += 1
-
-        print("\nOverall pass rates:")
-        for name in check_names:
-            rate = totals[name] / len(rows)
-            print(f"  {name:25s} {totals[name]}/{len(rows)} ({rate:.0%})")
-
-        print(f"\nTotal interactions evaluated: {len(rows)}")
+    print_report(conn, run_id)
+    print(f"\nTotal interactions evaluated: {len(eval_set)}")
 
 
 if __name__ == "__main__":
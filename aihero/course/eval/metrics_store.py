@@ -0,0 +1,213 @@
+"""
+Evaluation Metrics Store
+
+Persists per-check verdicts from evaluations.py in a SQLite database so
+results accumulate across runs instead of being printed and discarded.
+Each verdict is keyed by log file, log timestamp and agent config, and
+aggregation (pass rates by day, model, source or run) is done in SQL.
+
+Usage:
+    import metrics_store
+    conn = metrics_store.connect()
+    run_id = metrics_store.start_run(conn, eval_model='gpt-4o-mini')
+    metrics_store.record(conn, run_id, log_record, eval_result)
+    metrics_store.pass_rates(conn, group_by='day')
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+
+# --- Config ---
+METRICS_DB = Path(os.getenv('METRICS_DB', os.path.join(os.path.dirname(__file__), 'metrics.db')))
+
+GROUP_COLUMNS = {
+    'day': 'i.day',
+    'model': 'i.model',
+    'source': 'i.source',
+    'agent': 'i.agent_name',
+    'config': 'i.config_hash',
+    'run': 'v.run_id',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    eval_model TEXT
+);
+
+CREATE TABLE IF NOT EXISTS interactions (
+    log_file TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    log_timestamp TEXT,
+    day TEXT,
+    agent_name TEXT,
+    provider TEXT,
+    model TEXT,
+    source TEXT,
+    question TEXT,
+    PRIMARY KEY (log_file, config_hash)
+);
+
+CREATE TABLE IF NOT EXISTS verdicts (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    log_file TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    justification TEXT,
+    PRIMARY KEY (run_id, log_file, check_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_interactions_day ON interactions (day);
+CREATE INDEX IF NOT EXISTS idx_interactions_model ON interactions (model);
+CREATE INDEX IF NOT EXISTS idx_interactions_source ON interactions (source);
+CREATE INDEX IF NOT EXISTS idx_verdicts_check ON verdicts (check_name, run_id);
+CREATE INDEX IF NOT EXISTS idx_verdicts_latest ON verdicts (log_file, config_hash, check_name, run_id);
+"""
+
+
+def connect(path=METRICS_DB):
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def config_hash(log_record):
+    """Hash of the agent configuration that produced a log."""
+    config = {
+        'system_prompt': log_record.get('system_prompt'),
+        'provider': log_record.get('provider'),
+        'model': log_record.get('model'),
+        'tools': sorted(log_record.get('tools', [])),
+    }
+    data = json.dumps(config, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def start_run(conn, eval_model=None):
+    cursor = conn.execute(
+        "INSERT INTO runs (started_at, eval_model) VALUES (?, ?)",
+        (datetime.now().isoformat(timespec='seconds'), eval_model),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def evaluated_files(conn):
+    """Names of log files that already have verdicts."""
+    rows = conn.execute("SELECT DISTINCT log_file FROM verdicts")
+    return {log_file for (log_file,) in rows}
+
+
+def record(conn, run_id, log_record, eval_result):
+    """Append the verdicts for one evaluated log record."""
+    messages = log_record['messages']
+    log_file = Path(log_record['log_file']).name
+    config = config_hash(log_record)
+    timestamp = messages[-1].get('timestamp')
+    day = timestamp[:10] if isinstance(timestamp, str) else None
+
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO interactions
+            (log_file, config_hash, log_timestamp, day, agent_name, provider, model, source, question)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            log_file, config, timestamp, day,
+            log_record.get('agent_name'), log_record.get('provider'), log_record.get('model'),
+            log_record.get('source'), messages[0]['parts'][0]['content'],
+        ),
+    )
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO verdicts
+            (run_id, log_file, config_hash, check_name, passed, justification)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (run_id, log_file, config, c.check_name, int(c.check_pass), c.justification)
+            for c in eval_result.checklist
+        ],
+    )
+    conn.commit()
+
+
+def pass_rates(conn, group_by=None, run_id=None):
+    """
+    Pass rate per check, optionally grouped by one of GROUP_COLUMNS
+    and restricted to a single run. Returns (group, check_name, rate, count)
+    rows; group is None when group_by is None.
+
+    Across runs, only the latest verdict per interaction and check counts,
+    so re-evaluated logs are not counted twice (unless grouping by run).
+    """
+    group_column = GROUP_COLUMNS[group_by] if group_by else 'NULL'
+    if run_id is not None:
+        verdicts = "(SELECT * FROM verdicts WHERE run_id = ?)"
+        params = (run_id,)
+    elif group_by == 'run':
+        verdicts = "verdicts"
+        params = ()
+    else:
+        verdicts = """(
+            SELECT * FROM verdicts latest
+            WHERE run_id = (
+                SELECT MAX(run_id) FROM verdicts
+                WHERE log_file = latest.log_file
+                  AND config_hash = latest.config_hash
+                  AND check_name = latest.check_name
+            )
+        )"""
+        params = ()
+
+    query = f"""
+        SELECT {group_column} AS grp, v.check_name, AVG(v.passed), COUNT(*)
+        FROM {verdicts} v
+        JOIN interactions i ON i.log_file = v.log_file AND i.config_hash = v.config_hash
+        GROUP BY grp, v.check_name
+        ORDER BY grp, v.check_name
+    """
+    return conn.execute(query, params).fetchall()
+
+
+def failed_checks(conn, run_id):
+    """(question, failed check names) for every interaction in a run."""
+    query = """
+        SELECT i.question, GROUP_CONCAT(CASE WHEN v.passed = 0 THEN v.check_name END, ', ')
+        FROM verdicts v
+        JOIN interactions i ON i.log_file = v.log_file AND i.config_hash = v.config_hash
+        WHERE v.run_id = ?
+        GROUP BY v.log_file
+        ORDER BY v.log_file
+    """
+    return conn.execute(query, (run_id,)).fetchall()
+
+
+def previous_run(conn, run_id):
+    row = conn.execute(
+        "SELECT MAX(run_id) FROM verdicts WHERE run_id < ?", (run_id,)
+    ).fetchone()
+    return row[0]
+
+
+def compare_runs(conn, run_a, run_b):
+    """(check_name, rate_a, rate_b, delta) for checks present in either run."""
+    rates_a = {check: rate for _, check, rate, _ in pass_rates(conn, run_id=run_a)}
+    rates_b = {check: rate for _, check, rate, _ in pass_rates(conn, run_id=run_b)}
+
+    rows = []
+    for check in sorted(set(rates_a) | set(rates_b)):
+        rate_a = rates_a.get(check)
+        rate_b = rates_b.get(check)
+        delta = None
+        if rate_a is not None and rate_b is not None:
+            delta = rate_b - rate_a
+        rows.append((check, rate_a, rate_b, delta))
+    return rows
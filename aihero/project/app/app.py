@@ -1,8 +1,9 @@
 import streamlit as st
-import asyncio
-import ingest
+from concurrent.futures import ThreadPoolExecutor
 import search_agent
-import logs
+import search_tools
+import refresh
+import streaming
 from dotenv import load_dotenv
 load_dotenv('../.env', override=True)
 
@@ -13,17 +14,38 @@ REPOS = [
 ]
 
 
-@st.cache_resource
 def init_agent():
-    st.write("Indexing repos...")
-    index = ingest.index_data(REPOS, chunk=True)
-    agent = search_agent.init_agent(index)
-    return agent
+    refresher = refresh.IndexRefresher(REPOS, index_params={'chunk': True, 'chunk_by': 'section'})
+    search_tool = search_tools.SearchTool(refresher.build())
+    agent = search_agent.init_agent(search_tool=search_tool)
+    # Rebuild in the background when the repos change and swap the index in
+    refresher.start(search_tool)
+    return agent, search_tool
+
+
+@st.cache_resource
+def start_indexing():
+    # Index in the background so the page renders right away
+    executor = ThreadPoolExecutor(max_workers=1)
+    return executor.submit(init_agent)
+
 
+def get_agent():
+    global indexing
+    if indexing.done() and indexing.exception() is not None:
+        # Don't keep a failed build cached; start over on this request
+        start_indexing.clear()
+        indexing = start_indexing()
+    if not indexing.done():
+        with st.spinner("Indexing repos..."):
+            return indexing.result()
+    return indexing.result()
 
-agent = init_agent()
 
 st.set_page_config(page_title="Credit Risk Scorecard Assistant", layout="centered")
+
+indexing = start_indexing()
+
 st.title("Credit Risk Scorecard Assistant")
 st.caption("Ask me anything about credit scorecards, WoE, IV, PSI, and risk modeling")
 
@@ -36,29 +58,8 @@ for msg in st.session_state.messages:
 
 
 def stream_response(prompt: str):
-    async def agen():
-        async with agent.run_stream(user_prompt=prompt) as result:
-            last_len = 0
-            full_text = ""
-            async for chunk in result.stream_output(debounce_by=0.01):
-                new_text = chunk[last_len:]
-                last_len = len(chunk)
-                full_text = chunk
-                if new_text:
-                    yield new_text
-            logs.log_interaction_to_file(agent, result.new_messages())
-            st.session_state._last_response = full_text
-    
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    agen_obj = agen()
-    
-    try:
-        while True:
-            piece = loop.run_until_complete(agen_obj.__anext__())
-            yield piece
-    except StopAsyncIteration:
-        return
+    agent, search_tool = get_agent()
+    return streaming.stream_response(agent, prompt, search_tool=search_tool)
 
 
 if prompt := st.chat_input("Ask your question..."):
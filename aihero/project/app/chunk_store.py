@@ -0,0 +1,178 @@
+"""
+Columnar storage for indexed chunks.
+
+Document text lives once in a contiguous UTF-8 buffer and each chunk is
+a byte range into it, so overlapping sliding-window chunks do not
+duplicate text. Parent document metadata (filename, repo, frontmatter)
+is stored once per document instead of being copied into every chunk.
+Rows are exposed as lightweight read-only mappings; only the results
+actually returned by a search are turned into dicts.
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+
+class RowView(Mapping):
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.store.value(self.row, key)
+
+    def __iter__(self):
+        return iter(self.store.fields(self.row))
+
+    def __len__(self):
+        return len(self.store.fields(self.row))
+
+
+class ChunkStore(Sequence):
+    def __init__(self):
+        self.parents = []
+        self.parent_ids = array('l')
+        self.starts = array('q')
+        self.section_ids = array('l')
+        self.sections = []
+        self.section_lookup = {}
+        self.byte_starts = array('q')
+        self.byte_ends = array('q')
+        self.extras = {}
+
+        self.buffer = b''
+        self.parts = []
+        self.size = 0
+
+        # The parent being chunked, used to map chunks onto its text
+        self.open_text = None
+        self.open_offset = 0
+        self.open_cursor = (0, 0)
+
+    def __len__(self):
+        return len(self.parent_ids)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return RowView(self, row)
+
+    def append_bytes(self, data):
+        offset = self.size
+        self.parts.append(data)
+        self.size += len(data)
+        return offset
+
+    def add_parent(self, doc):
+        """Store a document's text and metadata once; returns its parent id."""
+        meta = {key: value for key, value in doc.items() if key != 'content'}
+        for key in ('filename', 'repo'):
+            if isinstance(meta.get(key), str):
+                meta[key] = sys.intern(meta[key])
+        self.parents.append(meta)
+
+        self.open_text = doc.get('content', '')
+        self.open_offset = self.append_bytes(self.open_text.encode('utf-8'))
+        self.open_cursor = (0, 0)
+        return len(self.parents) - 1
+
+    def byte_pos(self, pos):
+        # Chunks arrive in increasing start order, so encode only the
+        # text between the previous chunk start and this one
+        char_pos, byte_pos = self.open_cursor
+        if pos < char_pos:
+            char_pos, byte_pos = 0, 0
+        byte_pos += len(self.open_text[char_pos:pos].encode('utf-8'))
+        self.open_cursor = (pos, byte_pos)
+        return byte_pos
+
+    def add_chunk(self, parent_id, content, start=None, section=None):
+        pos = 0 if start is None else start
+        if parent_id == len(self.parents) - 1 and self.open_text.startswith(content, pos):
+            byte_start = self.open_offset + self.byte_pos(pos)
+            byte_end = byte_start + len(content.encode('utf-8'))
+        else:
+            data = content.encode('utf-8')
+            byte_start = self.append_bytes(data)
+            byte_end = byte_start + len(data)
+
+        self.byte_starts.append(byte_start)
+        self.byte_ends.append(byte_end)
+        self.parent_ids.append(parent_id)
+        self.starts.append(-1 if start is None else start)
+        self.section_ids.append(self.section_id(section))
+        return len(self.parent_ids) - 1
+
+    def section_id(self, section):
+        if section is None:
+            return -1
+        section_id = self.section_lookup.get(section)
+        if section_id is None:
+            section_id = len(self.sections)
+            self.sections.append(section)
+            self.section_lookup[section] = section_id
+        return section_id
+
+    def add_alternate(self, row, ref):
+        parent = self.parents[self.parent_ids[row]]
+        own = {key: parent[key] for key in ('repo', 'filename') if key in parent}
+        if ref == own or ref in self.value(row, 'alternates', []):
+            return
+        self.extras.setdefault(row, []).append(ref)
+
+    def freeze(self):
+        """Join pending text into the contiguous buffer."""
+        if self.parts:
+            self.buffer = self.buffer + b''.join(self.parts)
+            self.parts = []
+        self.open_text = None
+        return self
+
+    def content(self, row):
+        if self.parts:
+            self.freeze()
+        return self.buffer[self.byte_starts[row]:self.byte_ends[row]].decode('utf-8')
+
+    def value(self, row, key, default=KeyError):
+        if key == 'content':
+            return self.content(row)
+        if key == 'start' and self.starts[row] >= 0:
+            return self.starts[row]
+        if key == 'section' and self.section_ids[row] >= 0:
+            return self.sections[self.section_ids[row]]
+
+        parent = self.parents[self.parent_ids[row]]
+        if key == 'alternates' and row in self.extras:
+            return parent.get('alternates', []) + self.extras[row]
+        if key in parent and key not in ('start', 'section'):
+            return parent[key]
+
+        if default is KeyError:
+            raise KeyError(key)
+        return default
+
+    def fields(self, row):
+        fields = ['content']
+        if self.starts[row] >= 0:
+            fields.append('start')
+        if self.section_ids[row] >= 0:
+            fields.append('section')
+        parent = self.parents[self.parent_ids[row]]
+        fields.extend(key for key in parent if key not in ('start', 'section'))
+        if row in self.extras and 'alternates' not in parent:
+            fields.append('alternates')
+        return fields
+
+    def size_bytes(self):
+        size = self.size
+        for column in (self.parent_ids, self.starts, self.section_ids, self.byte_starts, self.byte_ends):
+            size += column.itemsize * len(column)
+        for meta in self.parents:
+            size += sys.getsizeof(meta) + sum(sys.getsizeof(value) for value in meta.values())
+        size += sum(sys.getsizeof(section) for section in self.sections)
+        return size
@@ -0,0 +1,190 @@
+"""
+Corpus registry
+
+Hosts several documentation corpora in one process. Each corpus is
+indexed on first use (or loaded from INDEX_CACHE_DIR if set), its memory
+footprint is estimated, and the least recently used corpora are evicted
+once the total goes over the memory budget.
+"""
+
+import os
+import sys
+import pickle
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+import ingest
+import search_agent
+
+MEMORY_BUDGET_MB = int(os.getenv('CORPUS_MEMORY_BUDGET_MB', '1024'))
+INDEX_CACHE_DIR = os.getenv('INDEX_CACHE_DIR')
+
+
+FAQ_PROMPT = """
+You are a helpful assistant that answers questions about the DataTalksClub data engineering course FAQ.
+
+Use the search tool to find relevant information from the FAQ before answering questions.
+
+If you can find specific information through search, use it to provide accurate answers.
+
+Always include references by citing the filename of the source material you used.
+Replace it with the full path to the GitHub repository:
+"https://github.com/DataTalksClub/faq/blob/main/"
+Format: [LINK TITLE](FULL_GITHUB_LINK)
+
+If the search doesn't return relevant results, let the user know and provide general guidance.
+""".strip()
+
+
+class CorpusSpec:
+    def __init__(self, name, repos, instructions, agent_name=None, index_params=None):
+        self.name = name
+        self.repos = repos
+        self.instructions = instructions
+        self.agent_name = agent_name or f"{name.replace('-', '_')}_agent"
+        self.index_params = index_params or {}
+
+
+class LoadedCorpus:
+    def __init__(self, spec, index, agent, size_bytes):
+        self.spec = spec
+        self.index = index
+        self.agent = agent
+        self.size_bytes = size_bytes
+
+
+def is_data_engineering(filename):
+    return 'data-engineering' in filename
+
+
+DEFAULT_CORPORA = [
+    CorpusSpec(
+        name='credit-risk',
+        repos=[
+            ('ing-bank', 'skorecard', 'main'),
+            ('guillermo-navas-palencia', 'optbinning', 'master'),
+            ('levist7', 'Credit_Risk_Modelling', 'main'),
+        ],
+        instructions=search_agent.SYSTEM_PROMPT,
+        agent_name='credit_risk_agent',
+        index_params={'chunk': True, 'chunk_by': 'section'},
+    ),
+    CorpusSpec(
+        name='dtc-faq',
+        repos=[('DataTalksClub', 'faq', 'main')],
+        instructions=FAQ_PROMPT,
+        agent_name='gh_agent',
+        index_params={'path_filter': is_data_engineering},
+    ),
+]
+
+
+def dict_size(d):
+    return sys.getsizeof(d) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in d.items())
+
+
+def estimate_size(index):
+    """
+    Rough memory footprint of a FilteredIndex in bytes: the chunk store,
+    the filter postings and the minsearch index (sparse TF-IDF matrices,
+    vectorizer vocabularies and the keyword data frame).
+    """
+    size = index.docs.size_bytes()
+    for postings in index.postings.values():
+        size += dict_size(postings)
+
+    minsearch_index = index.index
+    for matrix in getattr(minsearch_index, 'text_matrices', {}).values():
+        for attr in ('data', 'indices', 'indptr'):
+            array = getattr(matrix, attr, None)
+            if array is not None:
+                size += array.nbytes
+
+    for vectorizer in getattr(minsearch_index, 'vectorizers', {}).values():
+        size += dict_size(getattr(vectorizer, 'vocabulary_', {}))
+        # Terms pruned by min_df/max_df, kept by older scikit-learn versions
+        size += sum(sys.getsizeof(term) for term in getattr(vectorizer, 'stop_words_', None) or ())
+        idf = getattr(vectorizer, 'idf_', None)
+        if idf is not None:
+            size += idf.nbytes
+
+    keyword_df = getattr(minsearch_index, 'keyword_df', None)
+    if keyword_df is not None:
+        size += int(keyword_df.memory_usage(deep=True).sum())
+    return size
+
+
+class CorpusRegistry:
+    def __init__(self, specs=DEFAULT_CORPORA, memory_budget_mb=MEMORY_BUDGET_MB, cache_dir=INDEX_CACHE_DIR):
+        self.specs = {}
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.loaded = OrderedDict()
+        # Reentrant, since evict() checks memory_used() while holding it
+        self.lock = threading.RLock()
+        self.build_locks = {}
+
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec):
+        with self.lock:
+            self.specs[spec.name] = spec
+
+    def names(self):
+        return list(self.specs)
+
+    def memory_used(self):
+        with self.lock:
+            return sum(corpus.size_bytes for corpus in self.loaded.values())
+
+    def load_index(self, spec):
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = self.cache_dir / f"{spec.name}.pkl"
+            if cache_path.exists():
+                with cache_path.open('rb') as f_in:
+                    return pickle.load(f_in)
+
+        index = ingest.index_data(spec.repos, **spec.index_params)
+
+        if cache_path is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with cache_path.open('wb') as f_out:
+                pickle.dump(index, f_out)
+        return index
+
+    def evict(self):
+        # Never evict the corpus that was just used
+        while len(self.loaded) > 1 and self.memory_used() > self.memory_budget:
+            self.loaded.popitem(last=False)
+
+    def get(self, name):
+        with self.lock:
+            corpus = self.loaded.get(name)
+            if corpus is not None:
+                self.loaded.move_to_end(name)
+                return corpus
+            if name not in self.specs:
+                raise KeyError(f"Unknown corpus: {name}")
+            spec = self.specs[name]
+            build_lock = self.build_locks.setdefault(name, threading.Lock())
+
+        # Build outside the registry lock so other corpora stay available
+        with build_lock:
+            with self.lock:
+                corpus = self.loaded.get(name)
+            if corpus is None:
+                index = self.load_index(spec)
+                agent = search_agent.init_agent(index, name=spec.agent_name, instructions=spec.instructions)
+                corpus = LoadedCorpus(spec, index, agent, estimate_size(index))
+
+            with self.lock:
+                self.loaded[name] = corpus
+                self.loaded.move_to_end(name)
+                self.evict()
+        return corpus
+
+    def agent(self, name):
+        return self.get(name).agent
@@ -1,12 +1,134 @@
 import io
+import re
 import json
+import hashlib
 import zipfile
-import requests
-import frontmatter
-from minsearch import Index
+from functools import partial
 
+import search_tools
+from chunk_store import ChunkStore
+
+
+# Frontmatter keys with more distinct values than this (titles, dates)
+# are not worth a bitset per value
+MAX_KEYWORD_VALUES = 64
+
+JSON_WS_RE = re.compile(rb'[ \t\r\n]*')
+JSON_SCALAR_RE = re.compile(rb'[^,:\]}\s]+')
+JSON_TOKEN_RE = re.compile(rb'["\[\]{}]')
+
+MAX_CELL_CHARS = 20000
+
+
+def skip_ws(buf, pos):
+    return JSON_WS_RE.match(buf, pos).end()
+
+
+def skip_string(buf, pos):
+    end = pos
+    while True:
+        end = buf.find(b'"', end + 1)
+        if end < 0:
+            raise ValueError("unterminated JSON string")
+        backslashes = 0
+        while buf[end - 1 - backslashes] == 0x5c:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end + 1
+
+
+def skip_value(buf, pos):
+    """Return the offset just past the JSON value at pos without decoding it."""
+    char = buf[pos:pos + 1]
+    if char == b'"':
+        return skip_string(buf, pos)
+    if char not in (b'[', b'{'):
+        return JSON_SCALAR_RE.match(buf, pos).end()
+
+    depth = 0
+    while True:
+        match = JSON_TOKEN_RE.search(buf, pos)
+        if match is None:
+            raise ValueError("unterminated JSON value")
+        pos = match.start()
+        token = buf[pos]
+        if token == 0x22:  # '"'
+            pos = skip_string(buf, pos)
+            continue
+        pos += 1
+        if token in (0x5b, 0x7b):  # '[' '{'
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def iter_container(buf, pos, is_object):
+    """
+    Yield (key, value_start, value_end) for each member of the JSON
+    object or array starting at pos. Keys are None for arrays.
+    """
+    closing = b'}' if is_object else b']'
+    pos = skip_ws(buf, pos + 1)
+    if buf[pos:pos + 1] == closing:
+        return
+
+    while True:
+        key = None
+        if is_object:
+            key_end = skip_string(buf, pos)
+            key = json.loads(buf[pos:key_end])
+            pos = skip_ws(buf, key_end)
+            pos = skip_ws(buf, pos + 1)  # ':'
+
+        value_end = skip_value(buf, pos)
+        yield key, pos, value_end
+
+        pos = skip_ws(buf, value_end)
+        if buf[pos:pos + 1] == closing:
+            return
+        pos = skip_ws(buf, pos + 1)  # ','
+
+
+def iter_notebook_cells(content, max_cell_chars=MAX_CELL_CHARS):
+    """
+    Yield (cell_type, source) for each cell of a raw .ipynb file.
+
+    Only cell_type and source are decoded; outputs, attachments and
+    other metadata are skipped over without being parsed.
+    """
+    # json.loads accepts a UTF-8 byte order mark, so skip it too
+    pos = skip_ws(content, 3 if content.startswith(b'\xef\xbb\xbf') else 0)
+    for key, start, _ in iter_container(content, pos, is_object=True):
+        if key != 'cells':
+            continue
+        for _, cell_start, _ in iter_container(content, start, is_object=False):
+            cell_type = None
+            source = ''
+            for cell_key, value_start, value_end in iter_container(content, cell_start, is_object=True):
+                if cell_key == 'cell_type':
+                    cell_type = json.loads(content[value_start:value_end])
+                elif cell_key == 'source':
+                    source = json.loads(content[value_start:value_end])
+                    if isinstance(source, list):
+                        source = ''.join(source)
+            yield cell_type, source[:max_cell_chars]
+
+
+def read_notebook(content, max_cell_chars=MAX_CELL_CHARS):
+    parts = []
+    for cell_type, source in iter_notebook_cells(content, max_cell_chars=max_cell_chars):
+        if cell_type == 'code':
+            source = f'```python\n{source}\n```'
+        parts.append(source)
+    return ''.join(part + '\n\n' for part in parts)
+
+
+def read_repo_data(repo_owner, repo_name, branch='main', path_filter=None):
+    import requests
+    import frontmatter
 
-def read_repo_data(repo_owner, repo_name, branch='main'):
     url = f'https://codeload.github.com/{repo_owner}/{repo_name}/zip/refs/heads/{branch}'
     resp = requests.get(url)
     repository_data = []
@@ -14,6 +136,8 @@ def read_repo_data(repo_owner, repo_name, branch='main'):
 
     for file_info in zf.infolist():
         filename = file_info.filename.lower()
+        if path_filter is not None and not path_filter(file_info.filename.split('/', maxsplit=1)[-1]):
+            continue
 
         if filename.endswith('.md') or filename.endswith('.mdx'):
             with zf.open(file_info) as f_in:
@@ -22,24 +146,21 @@ def read_repo_data(repo_owner, repo_name, branch='main'):
                 data = post.to_dict()
                 _, filename_repo = file_info.filename.split('/', maxsplit=1)
                 data['filename'] = filename_repo
+                data['repo'] = repo_name
                 repository_data.append(data)
 
         elif filename.endswith('.ipynb'):
             with zf.open(file_info) as f_in:
-                nb = json.loads(f_in.read())
-                text = ''
-                for cell in nb.get('cells', []):
-                    source = ''.join(cell.get('source', []))
-                    text += source + '\n\n'
+                text = read_notebook(f_in.read())
                 _, filename_repo = file_info.filename.split('/', maxsplit=1)
-                data = {'content': text, 'filename': filename_repo}
+                data = {'content': text, 'filename': filename_repo, 'repo': repo_name}
                 repository_data.append(data)
 
         elif filename.endswith('.rst'):
             with zf.open(file_info) as f_in:
                 content = f_in.read().decode('utf-8', errors='ignore')
                 _, filename_repo = file_info.filename.split('/', maxsplit=1)
-                data = {'content': content, 'filename': filename_repo}
+                data = {'content': content, 'filename': filename_repo, 'repo': repo_name}
                 repository_data.append(data)
 
     zf.close()
@@ -72,17 +193,257 @@ def chunk_documents(docs, size=2000, step=1000):
     return chunks
 
 
-def index_data(repos, chunk=False, chunking_params=None):
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+MD_HEADING_RE = re.compile(r'^#{1,6}\s+(.+?)[\s#]*$')
+RST_UNDERLINE_RE = re.compile(r'^([=\-~^"\'`#*+:.])\1{2,}\s*$')
+
+
+def split_blocks(text, rst=False):
+    """
+    Split text into blocks at blank lines and section headings.
+
+    Fenced code blocks (including notebook code cells) are never split.
+    Returns a list of (start, end, title) tuples; title is set only
+    for heading blocks.
+    """
+    lines = text.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    blocks = []
+    block_start = None
+    in_fence = False
+    i = 0
+
+    while i < len(lines):
+        line = lines[i].rstrip()
+
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        if in_fence or FENCE_RE.match(line):
+            if block_start is None:
+                block_start = offsets[i]
+            i += 1
+            continue
+
+        title = None
+        heading_lines = 1
+        if rst:
+            if (line and not line[0].isspace() and i + 1 < len(lines)
+                    and RST_UNDERLINE_RE.match(lines[i + 1])
+                    and len(lines[i + 1].rstrip()) >= len(line)):
+                title = line.strip()
+                heading_lines = 2
+        else:
+            match = MD_HEADING_RE.match(line)
+            if match:
+                title = match.group(1)
+
+        if title is None and line.strip():
+            if block_start is None:
+                block_start = offsets[i]
+            i += 1
+            continue
+
+        if block_start is not None:
+            blocks.append((block_start, offsets[i], None))
+            block_start = None
+        if title is not None:
+            blocks.append((offsets[i], offsets[i + heading_lines], title))
+        i += heading_lines
+
+    if block_start is not None:
+        blocks.append((block_start, offsets[-1], None))
+    return blocks
+
+
+def split_sections(text, min_size=500, max_size=3000, rst=False):
+    """
+    Chunk text on section boundaries.
+
+    A heading starts a new chunk unless the current one is still
+    shorter than min_size. Blocks are packed into a chunk up to
+    max_size; a chunk still larger than max_size is split at the last
+    line break or space before the limit.
+    """
+    spans = []
+    title = None
+    current = None
+
+    for start, end, block_title in split_blocks(text, rst=rst):
+        if block_title is not None:
+            title = block_title
+            if current is not None and current[1] - current[0] >= min_size:
+                spans.append(current)
+                current = None
+
+        if (current is not None and end - current[0] > max_size
+                and current[1] - current[0] >= min_size):
+            spans.append(current)
+            current = None
+
+        if current is None:
+            current = [start, end, title]
+        else:
+            current[1] = end
+
+    if current is not None:
+        if spans and current[1] - current[0] < min_size and current[1] - spans[-1][0] <= max_size:
+            spans[-1][1] = current[1]
+        else:
+            spans.append(current)
+
+    result = []
+    for start, end, title in spans:
+        while start < end:
+            piece_end = min(end, start + max_size)
+            if piece_end < end:
+                # Prefer to cut at a line break or space in the second half
+                cut = max(text.rfind('\n', start, piece_end), text.rfind(' ', start, piece_end))
+                if cut > start + max_size // 2:
+                    piece_end = cut + 1
+            content = text[start:piece_end].rstrip()
+            if content.strip():
+                result.append({'start': start, 'section': title or '', 'content': content})
+            start = piece_end
+    return result
+
+
+def chunk_documents_by_section(docs, min_size=500, max_size=3000):
+    chunks = []
+    for doc in docs:
+        doc_copy = doc.copy()
+        doc_content = doc_copy.pop('content')
+        rst = doc_copy['filename'].lower().endswith('.rst')
+        doc_chunks = split_sections(doc_content, min_size=min_size, max_size=max_size, rst=rst)
+        for chunk in doc_chunks:
+            chunk.update(doc_copy)
+        chunks.extend(doc_chunks)
+    return chunks
+
+
+def content_hash(text):
+    normalized = ' '.join(text.split()).lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def doc_ref(doc):
+    """Where a document comes from: its repo (if known) and filename."""
+    return {key: doc[key] for key in ('repo', 'filename') if key in doc}
+
+
+def deduplicate(docs):
+    """
+    Drop documents or chunks whose normalized content was already seen.
+
+    The first copy is kept; the repo and filename of each dropped copy are
+    recorded in its 'alternates' so they can still be cited and filtered on.
+    """
+    kept = {}
+    unique = []
+    for doc in docs:
+        key = content_hash(doc['content'])
+        first = kept.get(key)
+        if first is None:
+            # Copy, so alternates don't leak into the caller's documents
+            # (IndexRefresher rebuilds from the same documents)
+            doc = dict(doc)
+            kept[key] = doc
+            unique.append(doc)
+            continue
+
+        alternates = first.get('alternates', [])
+        for ref in [doc_ref(doc)] + doc.get('alternates', []):
+            if ref != doc_ref(first) and ref not in alternates:
+                alternates = alternates + [ref]
+        first['alternates'] = alternates
+    return unique
+
+
+def build_chunk_store(docs, chunk_fn=None, dedup=True):
+    """
+    Chunk documents one at a time into a ChunkStore, so per-chunk dicts
+    never accumulate. With dedup, repeated chunk content is stored once
+    and the other copies are kept as alternates.
+    """
+    store = ChunkStore()
+    seen = {}
+
+    for doc in docs:
+        parent_id = store.add_parent(doc)
+        chunks = chunk_fn([doc]) if chunk_fn is not None else [doc]
+
+        for chunk in chunks:
+            if dedup:
+                key = content_hash(chunk['content'])
+                if key in seen:
+                    for ref in [doc_ref(doc)] + doc.get('alternates', []):
+                        store.add_alternate(seen[key], ref)
+                    continue
+
+            row = store.add_chunk(parent_id, chunk['content'], start=chunk.get('start'), section=chunk.get('section'))
+            if dedup:
+                seen[key] = row
+
+    return store.freeze()
+
+
+def index_data(repos, chunk=False, chunking_params=None, chunk_by='window', dedup=True,
+               keyword_fields=None, path_filter=None):
     all_docs = []
     for repo_owner, repo_name, branch in repos:
-        docs = read_repo_data(repo_owner, repo_name, branch=branch)
+        docs = read_repo_data(repo_owner, repo_name, branch=branch, path_filter=path_filter)
         all_docs.extend(docs)
 
-    if chunk:
+    return build_index(all_docs, chunk=chunk, chunking_params=chunking_params, chunk_by=chunk_by,
+                       dedup=dedup, keyword_fields=keyword_fields)
+
+
+def frontmatter_keys(docs, max_values=MAX_KEYWORD_VALUES):
+    """Frontmatter keys with few distinct scalar values, usable as filters."""
+    values_by_key = {}
+    for doc in docs:
+        for key, value in doc.items():
+            if key in ('content', 'filename', 'repo', 'alternates'):
+                continue
+            values = value if isinstance(value, list) else [value]
+            seen = values_by_key.setdefault(key, set())
+            for value in values:
+                # A non-scalar value rules the key out
+                if seen is None or not isinstance(value, (str, int, float, bool)):
+                    values_by_key[key] = seen = None
+                    break
+                seen.add(value)
+
+    return sorted(
+        key for key, seen in values_by_key.items()
+        if seen is not None and 0 < len(seen) <= max_values
+    )
+
+
+def build_index(all_docs, chunk=False, chunking_params=None, chunk_by='window', dedup=True,
+                keyword_fields=None):
+    if dedup:
+        all_docs = deduplicate(all_docs)
+
+    chunk_fn = None
+    if chunk and chunk_by == 'section':
+        if chunking_params is None:
+            chunking_params = {'min_size': 500, 'max_size': 3000}
+        chunk_fn = partial(chunk_documents_by_section, **chunking_params)
+    elif chunk:
         if chunking_params is None:
             chunking_params = {'size': 2000, 'step': 1000}
-        all_docs = chunk_documents(all_docs, **chunking_params)
+        chunk_fn = partial(chunk_documents, **chunking_params)
+
+    store = build_chunk_store(all_docs, chunk_fn=chunk_fn, dedup=chunk and dedup)
+
+    if keyword_fields is None:
+        keyword_fields = ['repo'] + frontmatter_keys(all_docs)
 
-    index = Index(text_fields=["content", "filename"])
-    index.fit(all_docs)
-    return index
+    return search_tools.FilteredIndex(
+        store,
+        text_fields=["content", "section", "filename"],
+        keyword_fields=keyword_fields,
+    )
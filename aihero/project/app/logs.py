@@ -3,12 +3,15 @@ import json
 import secrets
 from pathlib import Path
 from datetime import datetime
-from pydantic_ai.messages import ModelMessagesTypeAdapter
+
+import tracing
 
 LOG_DIR = Path(os.getenv('LOGS_DIRECTORY', 'logs'))
-LOG_DIR.mkdir(exist_ok=True)
 
 def log_entry(agent, messages, source="user"):
+    # pydantic_ai is heavy to import, so load it on the first log write
+    from pydantic_ai.messages import ModelMessagesTypeAdapter
+
     tools = []
     for ts in agent.toolsets:
         tools.extend(ts.tools.keys())
@@ -31,15 +34,20 @@ def serializer(obj):
     raise TypeError(f"Type {type(obj)} not serializable")
 
 def log_interaction_to_file(agent, messages, source='user'):
-    entry = log_entry(agent, messages, source)
-    ts = entry['messages'][-1]['timestamp']
-    ts_str = ts.strftime("%Y%m%d_%H%M%S")
-    rand_hex = secrets.token_hex(3)
-    
-    filename = f"{agent.name}_{ts_str}_{rand_hex}.json"
-    filepath = LOG_DIR / filename
-    
-    with filepath.open("w", encoding="utf-8") as f_out:
-        json.dump(entry, f_out, indent=2, default=serializer)
+    tracer = tracing.current()
+    with tracer.span('logs.write'):
+        entry = log_entry(agent, messages, source)
+        if tracer.enabled:
+            entry['trace_id'] = tracer.trace_id
+        ts = entry['messages'][-1]['timestamp']
+        ts_str = ts.strftime("%Y%m%d_%H%M%S")
+        rand_hex = secrets.token_hex(3)
+        
+        filename = f"{agent.name}_{ts_str}_{rand_hex}.json"
+        LOG_DIR.mkdir(exist_ok=True)
+        filepath = LOG_DIR / filename
+        
+        with filepath.open("w", encoding="utf-8") as f_out:
+            json.dump(entry, f_out, indent=2, default=serializer)
     
     return filepath
@@ -1,7 +1,9 @@
 import ingest
 import search_agent
 import logs
+import tracing
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv('../.env', override=True)
 
@@ -15,7 +17,7 @@ def initialize_index():
     print("Starting Credit Risk Scorecard Assistant")
     print("Initializing data ingestion...")
 
-    index = ingest.index_data(REPOS, chunk=True)
+    index = ingest.index_data(REPOS, chunk=True, chunk_by='section')
     print("Data indexing completed successfully!")
     return index
 
@@ -25,9 +27,19 @@ def initialize_agent(index):
     print("Agent initialized successfully!")
     return agent
 
+def answer_question(agent, question):
+    with tracing.current().span('chat', prompt=question):
+        response = asyncio.run(agent.run(user_prompt=question))
+        logs.log_interaction_to_file(agent, response.new_messages())
+    return response
+
 def main():
-    index = initialize_index()
-    agent = initialize_agent(index)
+    executor = ThreadPoolExecutor(max_workers=1)
+    # Index in the background while the user types the first question
+    indexing = executor.submit(initialize_index)
+    executor.shutdown(wait=False)
+    agent = None
+
     print("\nReady to answer your questions!")
     print("Type 'stop' to exit the program.\n")
 
@@ -37,9 +49,15 @@ def main():
             print("Goodbye!")
             break
 
+        if agent is None:
+            agent = initialize_agent(indexing.result())
+
         print("Processing your question...")
-        response = asyncio.run(agent.run(user_prompt=question))
-        logs.log_interaction_to_file(agent, response.new_messages())
+        tracer = tracing.start_trace('cli')
+        try:
+            response = tracing.trace_context(tracer).run(answer_question, agent, question)
+        finally:
+            tracer.finish()
 
         print("\nResponse:\n", response.output)
         print("\n" + "="*50 + "\n")
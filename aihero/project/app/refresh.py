@@ -0,0 +1,135 @@
+"""
+Background re-indexing
+
+IndexRefresher polls the head commit of each indexed repository and,
+when one has moved, re-downloads only the changed repositories, builds
+a new index in a background thread and swaps it into a SearchTool.
+Searches never wait on a rebuild: running searches finish against the
+index they started with and new ones pick up the new index.
+"""
+
+import os
+import zlib
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ingest
+
+REFRESH_INTERVAL_SECONDS = int(os.getenv('REFRESH_INTERVAL_SECONDS', '3600'))
+
+
+def latest_commit(repo_owner, repo_name, branch):
+    """Head commit SHA of a branch, or None if GitHub can't be reached."""
+    import requests
+
+    url = f'https://api.github.com/repos/{repo_owner}/{repo_name}/commits/{branch}'
+    headers = {'Accept': 'application/vnd.github.sha'}
+    token = os.getenv('GITHUB_TOKEN')
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    try:
+        resp = requests.get(url, headers=headers, timeout=10)
+    except requests.RequestException:
+        return None
+    if resp.status_code != 200:
+        return None
+    return resp.text.strip()
+
+
+def pack_docs(docs):
+    """Compress a repository's documents; text compresses several times over."""
+    return zlib.compress(pickle.dumps(docs, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def unpack_docs(packed):
+    return pickle.loads(zlib.decompress(packed))
+
+
+class IndexRefresher:
+    def __init__(self, repos, index_params=None, path_filter=None, interval=REFRESH_INTERVAL_SECONDS):
+        self.repos = repos
+        self.index_params = index_params or {}
+        self.path_filter = path_filter
+        self.interval = interval
+        self.commits = {}
+        self.pending_commits = {}
+        # Compressed documents per repository, so unchanged repositories
+        # don't have to be downloaded again on a rebuild
+        self.packed_docs = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def read_repo(self, repo, commit):
+        repo_owner, repo_name, branch = repo
+        docs = ingest.read_repo_data(repo_owner, repo_name, branch=branch, path_filter=self.path_filter)
+        self.packed_docs[repo] = pack_docs(docs)
+        # Record the commit only once its documents are read, so a failed
+        # download is retried on the next check
+        self.commits[repo] = commit
+        return docs
+
+    def build(self):
+        """Download every repository and build an index from scratch."""
+        # Look up head commits while downloading, so the first index
+        # doesn't wait on the GitHub API
+        executor = ThreadPoolExecutor(max_workers=len(self.repos) or 1)
+        commits = {repo: executor.submit(latest_commit, *repo) for repo in self.repos}
+        executor.shutdown(wait=False)
+
+        all_docs = []
+        for repo in self.repos:
+            all_docs.extend(self.read_repo(repo, None))
+        self.pending_commits = commits
+        return ingest.build_index(all_docs, **self.index_params)
+
+    def build_index(self):
+        all_docs = []
+        for repo in self.repos:
+            all_docs.extend(unpack_docs(self.packed_docs[repo]))
+        return ingest.build_index(all_docs, **self.index_params)
+
+    def changed_repos(self):
+        """Repositories whose head commit moved, with their new commit."""
+        for repo, future in self.pending_commits.items():
+            self.commits[repo] = future.result()
+        self.pending_commits = {}
+
+        changed = {}
+        for repo in self.repos:
+            commit = latest_commit(*repo)
+            # Unknown commits (API errors, rate limits) are not treated as changes
+            if commit is not None and commit != self.commits.get(repo):
+                changed[repo] = commit
+        return changed
+
+    def refresh(self, search_tool):
+        """Rebuild if any repository changed; returns True if the index was swapped."""
+        changed = self.changed_repos()
+        if not changed:
+            return False
+
+        for repo, commit in changed.items():
+            self.read_repo(repo, commit)
+        search_tool.swap_index(self.build_index())
+        return True
+
+    def run(self, search_tool):
+        while not self.stopped.wait(self.interval):
+            try:
+                if self.refresh(search_tool):
+                    print("Index refreshed")
+            except Exception as e:
+                # Keep serving the current index and try again next time
+                print(f"Index refresh failed: {e}")
+
+    def start(self, search_tool):
+        if self.interval <= 0:
+            return None
+        self.thread = threading.Thread(target=self.run, args=(search_tool,), daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,159 @@
+"""
+Second-stage reranking of search candidates.
+
+SearchTool over-fetches RERANK_CANDIDATES candidates from the lexical
+index and Reranker reorders that bounded set on the CPU using field-aware
+BM25F, query term coverage and phrase proximity. Term statistics come from
+the candidate set itself, so the cost depends only on the number of
+candidates, not on the size of the corpus. Scoring stops once the latency
+budget is used up and unscored candidates keep their first-stage order.
+"""
+
+import os
+import re
+import math
+import time
+from collections import Counter
+
+RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', '100'))
+CANDIDATE_BUDGET_MS = float(os.getenv('CANDIDATE_BUDGET_MS', '150'))
+RERANK_BUDGET_MS = float(os.getenv('RERANK_BUDGET_MS', '30'))
+
+FIELD_WEIGHTS = {'content': 1.0, 'section': 3.0, 'filename': 2.0}
+
+SCORE_WEIGHTS = {'bm25f': 0.5, 'coverage': 0.3, 'proximity': 0.2, 'first_stage': 0.1}
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it of on or
+should the to what when where which why with you
+""".split())
+
+
+def tokenize(text):
+    return re.findall(r'[^\W_]+', text.lower())
+
+
+def query_terms(query):
+    terms = [term for term in tokenize(query) if term not in STOPWORDS]
+    # Fall back to all terms for queries made only of stopwords
+    return list(dict.fromkeys(terms or tokenize(query)))
+
+
+def min_window(positions):
+    """
+    Length in tokens of the shortest window containing one position of
+    every term in positions (term -> sorted positions).
+    """
+    events = sorted((pos, term) for term, term_positions in positions.items() for pos in term_positions)
+    counts = {}
+    best = None
+    left = 0
+
+    for pos, term in events:
+        counts[term] = counts.get(term, 0) + 1
+        while len(counts) == len(positions):
+            left_pos, left_term = events[left]
+            width = pos - left_pos + 1
+            if best is None or width < best:
+                best = width
+            counts[left_term] -= 1
+            if not counts[left_term]:
+                del counts[left_term]
+            left += 1
+    return best
+
+
+def proximity(terms, tokens):
+    """Distinct matched terms over the shortest window holding them; 1.0 for an exact phrase."""
+    wanted = set(terms)
+    positions = {}
+    for pos, token in enumerate(tokens):
+        if token in wanted:
+            positions.setdefault(token, []).append(pos)
+
+    if len(positions) < 2:
+        return 0.0
+    return len(positions) / min_window(positions)
+
+
+class Reranker:
+    def __init__(self, budget_ms=RERANK_BUDGET_MS, field_weights=None, score_weights=None, k1=1.2, b=0.75):
+        self.budget_ms = budget_ms
+        self.field_weights = field_weights or FIELD_WEIGHTS
+        self.score_weights = score_weights or SCORE_WEIGHTS
+        self.k1 = k1
+        self.b = b
+
+    def field_tokens(self, candidate):
+        return {
+            field: tokenize(str(candidate.get(field) or ''))
+            for field in self.field_weights
+        }
+
+    def rerank(self, query, candidates):
+        """
+        Reorder candidates (in first-stage order); returns the reordered
+        list and the number of candidates scored within the budget.
+        """
+        terms = query_terms(query)
+        if not terms or len(candidates) < 2:
+            return candidates, 0
+
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        tokenized = []
+        for candidate in candidates:
+            if tokenized and time.perf_counter() > deadline:
+                break
+            tokenized.append(self.field_tokens(candidate))
+
+        scored = len(tokenized)
+        scores = self.score(terms, tokenized)
+        reranked = sorted(range(scored), key=lambda i: -scores[i])
+        return [candidates[i] for i in reranked] + candidates[scored:], scored
+
+    def score(self, terms, tokenized):
+        n = len(tokenized)
+        avg_len = {
+            field: max(sum(len(tokens[field]) for tokens in tokenized) / n, 1.0)
+            for field in self.field_weights
+        }
+
+        # Term frequencies per field, normalized by field length (BM25F)
+        weighted_tfs = []
+        doc_freq = dict.fromkeys(terms, 0)
+        for tokens in tokenized:
+            weighted_tf = dict.fromkeys(terms, 0.0)
+            for field, weight in self.field_weights.items():
+                field_tokens = tokens[field]
+                if not field_tokens:
+                    continue
+                norm = 1 - self.b + self.b * len(field_tokens) / avg_len[field]
+                counts = Counter(field_tokens)
+                for term in terms:
+                    tf = counts[term]
+                    if tf:
+                        weighted_tf[term] += weight * tf / norm
+            for term in terms:
+                if weighted_tf[term]:
+                    doc_freq[term] += 1
+            weighted_tfs.append(weighted_tf)
+
+        idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+        bm25f = [
+            sum(idf[term] * tf / (self.k1 + tf) for term, tf in weighted_tf.items())
+            for weighted_tf in weighted_tfs
+        ]
+        max_bm25f = max(bm25f) or 1.0
+
+        weights = self.score_weights
+        scores = []
+        for rank, (tokens, weighted_tf) in enumerate(zip(tokenized, weighted_tfs)):
+            coverage = sum(1 for tf in weighted_tf.values() if tf) / len(terms)
+            score = (
+                weights['bm25f'] * bm25f[rank] / max_bm25f
+                + weights['coverage'] * coverage
+                + weights['proximity'] * proximity(terms, tokens['content'])
+                + weights['first_stage'] * (1 - rank / n)
+            )
+            scores.append(score)
+        return scores
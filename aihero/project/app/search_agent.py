@@ -1,5 +1,5 @@
 import search_tools
-from pydantic_ai import Agent
+import tracing
 
 
 SYSTEM_PROMPT = """
@@ -19,13 +19,28 @@ Format: [LINK TITLE](FULL_GITHUB_LINK)
 If the search doesn't return relevant results, let the user know and provide general guidance.
 """.strip()
 
-def init_agent(index):
-    search_tool = search_tools.SearchTool(index=index)
+def init_agent(index=None, search_params=None, name="credit_risk_agent", instructions=SYSTEM_PROMPT,
+               search_tool=None):
+    from pydantic_ai import Agent
+
+    if search_tool is None:
+        if search_params is None:
+            search_params = {}
+        search_tool = search_tools.SearchTool(index=index, **search_params)
+
+    model = 'gpt-4o-mini'
+    if tracing.enabled():
+        model = tracing.trace_model(model)
 
     agent = Agent(
-        name="credit_risk_agent",
-        instructions=SYSTEM_PROMPT,
+        name=name,
+        instructions=instructions,
         tools=[search_tool.search],
-        model='gpt-4o-mini'
+        model=model
     )
+
+    if search_tools.PREFETCH_MODE == 'inject':
+        # Results prefetched for the user's question go into the first
+        # request, so the model can often answer without a tool call
+        agent.instructions(search_tools.prefetched_context)
     return agent
@@ -1,17 +1,352 @@
-from typing import List, Any
+import os
+import re
+import json
+import time
+import contextvars
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import rerank
+import tracing
+
+# 'off', 'cache' (prefetched results answer a matching tool call) or
+# 'inject' (prefetched results are also added to the instructions)
+PREFETCH_MODE = os.getenv('SEARCH_PREFETCH', 'off')
+
+PREFETCH_TEMPLATE = """
+Search results for the user's question, already retrieved with the search tool:
+{results}
+""".strip()
+
+# Per-search budgets for the text returned to the agent
+MAX_CHARS = 10000
+MAX_SPAN_CHARS = 4000
+
+prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch')
+
+_request_cache = contextvars.ContextVar('search_cache', default=None)
+
+
+def merge_overlapping(results, num_results=None, max_span_chars=None):
+    """
+    Pick up to num_results passages in rank order, merging a lower-ranked
+    chunk into an already picked passage from the same file when their
+    character spans overlap or touch.
+
+    A chunk that would grow a passage past max_span_chars is dropped, as
+    it mostly repeats that passage. Results without a 'start' offset
+    (unchunked documents) are never merged. A merged passage keeps the
+    metadata of its best-ranked chunk.
+    """
+    picked = []
+
+    for result in results:
+        merged = False
+        if 'start' in result:
+            for span in picked:
+                if 'start' not in span or span.get('filename') != result.get('filename'):
+                    continue
+                start, end = span['start'], span['start'] + len(span['content'])
+                hit_start, hit_end = result['start'], result['start'] + len(result['content'])
+                if hit_start > end or hit_end < start:
+                    continue
+
+                merged = True
+                new_start, new_end = min(start, hit_start), max(end, hit_end)
+                if max_span_chars is not None and new_end - new_start > max_span_chars:
+                    break
+                content = span['content']
+                if hit_start < start:
+                    content = result['content'][:start - hit_start] + content
+                if hit_end > end:
+                    content += result['content'][end - hit_start:]
+                span['start'] = new_start
+                span['content'] = content
+                break
+
+        if not merged and (num_results is None or len(picked) < num_results):
+            picked.append(dict(result))
+
+    return picked
+
+
+def limit_chars(results, max_chars):
+    """Keep results in rank order until max_chars of content is used up."""
+    limited = []
+    remaining = max_chars
+
+    for result in results:
+        if remaining <= 0:
+            break
+        content = result.get('content', '')
+        if len(content) > remaining:
+            result = dict(result, content=content[:remaining])
+        limited.append(result)
+        remaining -= len(content)
+
+    return limited
+
+
+def ids_to_mask(ids, size):
+    bits = bytearray((size + 7) // 8)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def mask_to_ids(mask, size):
+    bits = mask.to_bytes((size + 7) // 8, 'little')
+    ids = []
+    for byte_pos, byte in enumerate(bits):
+        if not byte:
+            continue
+        for bit in range(8):
+            if byte >> bit & 1:
+                ids.append(byte_pos * 8 + bit)
+    return ids
+
+
+class FilteredIndex:
+    """
+    Wraps a minsearch index with precomputed metadata postings.
+
+    Each keyword field value maps to a bitset (a Python int) of the
+    documents that carry it, and filenames are kept sorted so a path
+    prefix resolves to a contiguous range. A filtered search scores
+    only the matching rows of the already fitted TF-IDF matrices, so
+    filtered and unfiltered scores agree.
+    """
+
+    def __init__(self, docs, text_fields, keyword_fields):
+        from minsearch import Index
+
+        self.docs = docs
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields
+
+        self.index = Index(text_fields=text_fields, keyword_fields=keyword_fields)
+        self.index.fit(docs)
+
+        self.postings = {}
+        for field in keyword_fields:
+            ids_by_value = {}
+            for i, doc in enumerate(docs):
+                values = doc.get(field)
+                if not isinstance(values, list):
+                    values = [values]
+                # Deduplicated copies match the filters of the copies they replace
+                values = values + [ref.get(field) for ref in doc.get('alternates', [])]
+                for value in values:
+                    if isinstance(value, (str, int, float, bool)):
+                        ids_by_value.setdefault(value, []).append(i)
+            self.postings[field] = {
+                value: ids_to_mask(ids, len(docs)) for value, ids in ids_by_value.items()
+            }
+
+        self.ids_by_filename = {}
+        for i, doc in enumerate(docs):
+            filenames = [doc.get('filename', '')] + [ref.get('filename', '') for ref in doc.get('alternates', [])]
+            for filename in set(filenames):
+                self.ids_by_filename.setdefault(filename, []).append(i)
+        self.filenames = sorted(self.ids_by_filename)
+
+    def prefix_mask(self, path_prefix):
+        ids = []
+        pos = bisect_left(self.filenames, path_prefix)
+        while pos < len(self.filenames) and self.filenames[pos].startswith(path_prefix):
+            ids.extend(self.ids_by_filename[self.filenames[pos]])
+            pos += 1
+        return ids_to_mask(ids, len(self.docs))
+
+    def filter_mask(self, filter_dict=None, path_prefix=None):
+        mask = (1 << len(self.docs)) - 1
+        for field, value in (filter_dict or {}).items():
+            mask &= self.postings.get(field, {}).get(value, 0)
+        if path_prefix:
+            mask &= self.prefix_mask(path_prefix)
+        return mask
+
+    def search_subset(self, query, ids, num_results):
+        import numpy as np
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        ids = np.asarray(ids)
+        scores = np.zeros(len(ids))
+        for field in self.text_fields:
+            matrix = self.index.text_matrices[field]
+            # minsearch fits a one-row placeholder for fields with no terms
+            if matrix.shape[0] != len(self.docs):
+                continue
+            query_vec = self.index.vectorizers[field].transform([query])
+            scores += cosine_similarity(query_vec, matrix[ids]).flatten()
+
+        num_results = min(num_results, len(ids))
+        top = np.argpartition(scores, -num_results)[-num_results:]
+        top = top[np.argsort(-scores[top])]
+        return [self.docs[int(ids[i])] for i in top if scores[i] > 0]
+
+    def search_rows(self, query, num_results=5, filter_dict=None, path_prefix=None):
+        """Like search, but returns the stored rows without copying them."""
+        if not filter_dict and not path_prefix:
+            return self.index.search(query, num_results=num_results)
+
+        mask = self.filter_mask(filter_dict, path_prefix)
+        if mask == 0:
+            return []
+        ids = mask_to_ids(mask, len(self.docs))
+        return self.search_subset(query, ids, num_results)
+
+    def search(self, query, num_results=5, filter_dict=None, path_prefix=None):
+        # Rows may be ChunkStore views; materialize only the returned top-k
+        rows = self.search_rows(query, num_results, filter_dict, path_prefix)
+        return [dict(row) for row in rows]
+
+
+def query_key(query, repo=None, path_prefix=None, filters=None):
+    """Cache key that ignores case, punctuation and word order."""
+    terms = tuple(sorted(set(re.findall(r'\w+', query.lower()))))
+    filters = json.dumps(filters, sort_keys=True, default=str) if filters else None
+    return (terms, repo or None, path_prefix or None, filters)
+
+
+class RequestCache:
+    """Search results for one user request, keyed by query_key."""
+
+    def __init__(self):
+        self.futures = {}
+        self.inject_key = None
+
+
+def prefetched_context():
+    """Prefetched results to add to the instructions, or '' if there are none."""
+    cache = _request_cache.get()
+    if cache is None or cache.inject_key is None:
+        return ''
+    try:
+        results = cache.futures[cache.inject_key].result()
+    except Exception:
+        return ''
+    return PREFETCH_TEMPLATE.format(results=json.dumps(results, default=str))
+
 
 class SearchTool:
-    def __init__(self, index):
+    def __init__(self, index, num_results=5, fetch_multiplier=3, max_chars=MAX_CHARS, max_span_chars=MAX_SPAN_CHARS,
+                 num_candidates=rerank.RERANK_CANDIDATES, candidate_budget_ms=rerank.CANDIDATE_BUDGET_MS,
+                 reranker=None):
+        self.index = index
+        self.num_results = num_results
+        self.fetch_multiplier = fetch_multiplier
+        self.max_chars = max_chars
+        self.max_span_chars = max_span_chars
+        # num_candidates=0 turns off the second stage
+        self.num_candidates = num_candidates
+        self.candidate_budget_ms = candidate_budget_ms
+        self.reranker = reranker or rerank.Reranker()
+
+    def swap_index(self, index):
+        """Replace the index; searches already running keep the old one."""
+        old_index = self.index
         self.index = index
+        return old_index
 
-    def search(self, query: str) -> List[Any]:
+    def search(self, query: str, repo: Optional[str] = None, path_prefix: Optional[str] = None,
+               filters: Optional[Dict[str, Any]] = None) -> List[Any]:
         """
-        Perform a text-based search on the credit risk scorecard index.
+        Perform a text-based search on the documentation index.
 
         Args:
             query (str): The search query string.
+            repo (str, optional): Restrict results to one repository
+                by name, e.g. "skorecard" or "optbinning".
+            path_prefix (str, optional): Restrict results to files whose
+                path within the repository starts with this prefix, e.g. "docs/".
+            filters (dict, optional): Exact-match filters on frontmatter
+                fields seen in earlier results, e.g. {"category": "tutorial"}.
 
         Returns:
             List[Any]: A list of up to 5 search results returned by the index.
         """
-        return self.index.search(query, num_results=5)
+        cache = _request_cache.get()
+        if cache is None:
+            return self.run_search(query, repo, path_prefix, filters)
+
+        key = query_key(query, repo, path_prefix, filters)
+        future = cache.futures.get(key)
+        if future is not None:
+            tracing.current().event('search.cache_hit', query=query, prefetched=future.done())
+            return future.result()
+
+        future = cache.futures[key] = Future()
+        try:
+            future.set_result(self.run_search(query, repo, path_prefix, filters))
+        except Exception as e:
+            future.set_exception(e)
+        return future.result()
+
+    def prefetch(self, query, inject=False):
+        """
+        Start searching for query in the background and keep the results in
+        a cache for the current request, so a matching tool call returns
+        without searching again. With inject=True the results are also
+        returned by prefetched_context(). Call inside the request's context.
+        """
+        cache = _request_cache.get()
+        if cache is None:
+            cache = RequestCache()
+            _request_cache.set(cache)
+
+        key = query_key(query)
+        if key not in cache.futures:
+            context = contextvars.copy_context()
+            cache.futures[key] = prefetch_executor.submit(context.run, self.run_search, query)
+        if inject:
+            cache.inject_key = key
+        return cache.futures[key]
+
+    def run_search(self, query, repo=None, path_prefix=None, filters=None):
+        # Read the index once so a concurrent swap_index doesn't affect this call
+        index = self.index
+
+        filter_dict = dict(filters or {})
+        if repo:
+            filter_dict['repo'] = repo
+
+        filters = {}
+        if filter_dict:
+            filters['filter_dict'] = filter_dict
+        if path_prefix:
+            filters['path_prefix'] = path_prefix
+
+        tracer = tracing.current()
+        with tracer.span('search', query=query, **filters) as span:
+            # Over-fetch so that merging overlapping chunks still leaves
+            # num_results distinct passages
+            num_fetch = max(self.num_candidates, self.num_results * self.fetch_multiplier)
+
+            # Rank candidates as stored rows and copy only the ones kept
+            search = getattr(index, 'search_rows', index.search)
+
+            with tracer.span('search.candidates') as stage:
+                started = time.perf_counter()
+                results = search(query, num_results=num_fetch, **filters)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                stage['candidates'] = len(results)
+                # Stage one scores the whole corpus, so its cost doesn't depend
+                # on num_candidates; an overrun is only recorded
+                if elapsed_ms > self.candidate_budget_ms:
+                    stage['over_budget_ms'] = elapsed_ms - self.candidate_budget_ms
+
+            if self.num_candidates > 0:
+                with tracer.span('search.rerank') as stage:
+                    results, stage['scored'] = self.reranker.rerank(query, results)
+
+            # Merge only the top of the reranked list; merging all candidates
+            # chains overlapping windows into whole files
+            results = [dict(row) for row in results[:self.num_results * self.fetch_multiplier]]
+            results = merge_overlapping(results, self.num_results, self.max_span_chars)
+
+            if self.max_chars is not None:
+                results = limit_chars(results, self.max_chars)
+            span['results'] = len(results)
+        return results
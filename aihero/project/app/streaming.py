@@ -0,0 +1,60 @@
+"""
+Streaming chat responses for the Streamlit UIs (app.py and streamlit_app.py).
+
+stream_response drives the agent's async stream from Streamlit's
+synchronous st.write_stream, traces the request and logs the interaction.
+"""
+
+import asyncio
+
+import streamlit as st
+
+import logs
+import search_tools
+import tracing
+
+
+def stream_response(agent, prompt, search_tool=None, **span_args):
+    """
+    Yield the agent's response to prompt as text deltas. The full text is
+    left in st.session_state._last_response; span_args are added to the
+    chat span. With a search_tool, the question is prefetched according
+    to SEARCH_PREFETCH.
+    """
+    tracer = tracing.start_trace('chat')
+    context = tracing.trace_context(tracer)
+
+    if search_tool is not None and search_tools.PREFETCH_MODE != 'off':
+        # Search for the question while the first model request is in flight
+        inject = search_tools.PREFETCH_MODE == 'inject'
+        context.run(search_tool.prefetch, prompt, inject=inject)
+
+    async def agen():
+        with tracer.span('chat', prompt=prompt, **span_args) as span:
+            async with agent.run_stream(user_prompt=prompt) as result:
+                last_len = 0
+                full_text = ""
+                async for chunk in result.stream_output(debounce_by=0.01):
+                    new_text = chunk[last_len:]
+                    last_len = len(chunk)
+                    full_text = chunk
+                    if new_text:
+                        tracer.event('stream.chunk', chars=len(new_text))
+                        yield new_text
+                span['response_chars'] = len(full_text)
+                logs.log_interaction_to_file(agent, result.new_messages())
+                st.session_state._last_response = full_text
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    agen_obj = agen()
+
+    try:
+        while True:
+            # Run each step inside the trace context so tool calls see the tracer
+            piece = context.run(loop.run_until_complete, agen_obj.__anext__())
+            yield piece
+    except StopAsyncIteration:
+        return
+    finally:
+        tracer.finish()
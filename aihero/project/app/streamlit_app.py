@@ -0,0 +1,46 @@
+import streamlit as st
+import corpora
+import streaming
+from dotenv import load_dotenv
+load_dotenv('../.env', override=True)
+
+
+@st.cache_resource
+def get_registry():
+    return corpora.CorpusRegistry()
+
+
+st.set_page_config(page_title="Documentation Assistant", layout="centered")
+
+registry = get_registry()
+corpus_name = st.sidebar.selectbox("Corpus", registry.names())
+st.sidebar.caption(f"Index memory: {registry.memory_used() / 1024 / 1024:.0f} MB")
+
+st.title("Documentation Assistant")
+st.caption(f"Ask me anything about the {corpus_name} documentation")
+
+messages_key = f"messages_{corpus_name}"
+if messages_key not in st.session_state:
+    st.session_state[messages_key] = []
+
+for msg in st.session_state[messages_key]:
+    with st.chat_message(msg["role"]):
+        st.markdown(msg["content"])
+
+
+def stream_response(prompt: str):
+    with st.spinner(f"Loading {corpus_name}..."):
+        agent = registry.agent(corpus_name)
+    return streaming.stream_response(agent, prompt, corpus=corpus_name)
+
+
+if prompt := st.chat_input("Ask your question..."):
+    st.session_state[messages_key].append({"role": "user", "content": prompt})
+    with st.chat_message("user"):
+        st.markdown(prompt)
+
+    with st.chat_message("assistant"):
+        response_text = st.write_stream(stream_response(prompt))
+
+    final_text = getattr(st.session_state, "_last_response", response_text)
+    st.session_state[messages_key].append({"role": "assistant", "content": final_text})
@@ -0,0 +1,157 @@
+"""
+Per-request tracing written to local files in the Chrome trace event
+format, which can be opened in https://ui.perfetto.dev or chrome://tracing.
+
+Tracing is off unless TRACE_SAMPLE_RATE is set above 0. When it is off,
+current() returns a shared no-op tracer, so instrumented code pays only
+for a context variable lookup.
+"""
+
+import os
+import json
+import time
+import random
+import secrets
+import threading
+import contextvars
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+TRACE_DIR = Path(os.getenv('TRACES_DIRECTORY', 'traces'))
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+
+
+class NullSpan:
+    def __setitem__(self, key, value):
+        pass
+
+
+class NullTracer:
+    enabled = False
+    trace_id = None
+
+    @contextmanager
+    def span(self, name, **args):
+        yield NULL_SPAN
+
+    def event(self, name, **args):
+        pass
+
+    def finish(self):
+        return None
+
+
+NULL_SPAN = NullSpan()
+NULL_TRACER = NullTracer()
+
+_current = contextvars.ContextVar('tracer', default=NULL_TRACER)
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, name, trace_dir=None):
+        self.name = name
+        self.trace_dir = trace_dir or TRACE_DIR
+        self.trace_id = secrets.token_hex(8)
+        self.started_at = datetime.now()
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+
+    def now_us(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    @contextmanager
+    def span(self, name, **args):
+        start = self.now_us()
+        try:
+            yield args
+        finally:
+            self.events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': start,
+                'dur': self.now_us() - start,
+                'pid': self.pid,
+                'tid': threading.get_ident(),
+                'args': args,
+            })
+
+    def event(self, name, **args):
+        self.events.append({
+            'name': name,
+            'ph': 'i',
+            's': 't',
+            'ts': self.now_us(),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+    def finish(self):
+        ts_str = self.started_at.strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.name}_{ts_str}_{self.trace_id}.json"
+        self.trace_dir.mkdir(exist_ok=True)
+        filepath = self.trace_dir / filename
+
+        trace = {
+            'traceEvents': self.events,
+            'otherData': {
+                'trace_id': self.trace_id,
+                'started_at': self.started_at.isoformat(),
+            },
+        }
+        with filepath.open("w", encoding="utf-8") as f_out:
+            json.dump(trace, f_out, default=str)
+
+        return filepath
+
+
+def enabled():
+    return TRACE_SAMPLE_RATE > 0
+
+
+def start_trace(name, sample_rate=None):
+    """Return a new Tracer for a sampled request, or the no-op tracer."""
+    if sample_rate is None:
+        sample_rate = TRACE_SAMPLE_RATE
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return NULL_TRACER
+    return Tracer(name)
+
+
+def current():
+    return _current.get()
+
+
+def trace_context(tracer):
+    """
+    Return a copy of the current context with tracer active.
+
+    Run request handling with context.run(...) so that tasks and tool
+    calls started from it see the tracer through current().
+    """
+    context = contextvars.copy_context()
+    context.run(_current.set, tracer)
+    return context
+
+
+def trace_model(model):
+    """Wrap a pydantic-ai model so every model request is recorded as a span."""
+    from contextlib import asynccontextmanager
+    from pydantic_ai.models.wrapper import WrapperModel
+
+    class TracedModel(WrapperModel):
+        async def request(self, *args, **kwargs):
+            with current().span('model.request', model=self.model_name):
+                return await super().request(*args, **kwargs)
+
+        @asynccontextmanager
+        async def request_stream(self, *args, **kwargs):
+            with current().span('model.request_stream', model=self.model_name):
+                async with super().request_stream(*args, **kwargs) as response:
+                    yield response
+
+    return TracedModel(model)